@@ -7,18 +7,25 @@ Based on patterns from Docker-OCR-2 llm_notes.
 
 from __future__ import annotations
 
+import atexit
 import base64
+import hashlib
 import json as json_module
 import logging
 import os
 import re
 import subprocess
 import sys
-import tempfile
 import time as time_module
-from collections import deque
-from threading import Lock
-from typing import TYPE_CHECKING, Any, TypedDict
+from collections import OrderedDict, deque
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from functools import lru_cache
+from queue import Empty, Queue
+from threading import Lock, Thread, local
+from typing import IO, Any, NamedTuple, TypedDict, cast
 
 # Enable PaddlePaddle verbose logging BEFORE importing paddle
 os.environ.setdefault("GLOG_v", "1")
@@ -27,11 +34,21 @@ os.environ.setdefault("FLAGS_call_stack_level", "2")
 
 import cv2
 import numpy as np
+import orjson
 import psycopg2
 from flask import Flask, Response, jsonify, request
+from flask_compress import Compress
 from flask_cors import CORS
+from flask_orjson import OrjsonProvider
 from paddleocr import PaddleOCR
+from psycopg2.extensions import connection, cursor
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+try:
+    import tesserocr
+except ImportError:  # Optional: without it, OSD runs through the tesseract CLI
+    tesserocr = None  # type: ignore[assignment]
 
 
 class LogEntry(TypedDict):
@@ -42,8 +59,78 @@ class LogEntry(TypedDict):
     message: str
 
 
-if TYPE_CHECKING:
-    from psycopg2.extensions import connection
+class OcrBlocks(NamedTuple):
+    """
+    OCR text blocks in column-oriented (structure-of-arrays) layout.
+
+    Index i across every field describes one detected text line. Keeping the
+    geometry in NumPy arrays lets layout analysis sort, bucket, and threshold
+    all blocks at once instead of looking up dict keys per block.
+    """
+
+    texts: list[str]
+    confidences: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    w: np.ndarray
+    h: np.ndarray
+
+    @classmethod
+    def from_ocr_result(
+        cls, texts: list[str], scores: list[float], polys: list[Any], scale: float = 1.0
+    ) -> OcrBlocks:
+        """
+        Build blocks from PaddleOCR rec_texts, rec_scores and dt_polys.
+
+        Coordinates are multiplied by scale to map them back onto the uploaded
+        image when OCR ran on a resized copy.
+        """
+        count = len(texts)
+        confidences = np.zeros(count, dtype=np.float64)
+        num_scores = min(count, len(scores))
+        confidences[:num_scores] = np.asarray(scores[:num_scores], dtype=np.float64)
+
+        # dt_polys holds one (4, 2) quad per line; lines without a box keep zeros
+        boxes = np.zeros((count, 4, 2), dtype=np.float64)
+        num_polys = min(count, len(polys))
+        if num_polys:
+            boxes[:num_polys] = np.asarray(polys[:num_polys], dtype=np.float64).reshape(
+                num_polys, -1, 2
+            )
+        if scale != 1.0:
+            boxes *= scale
+        mins = boxes.min(axis=1)
+        maxs = boxes.max(axis=1)
+
+        return cls(
+            texts=list(texts),
+            confidences=confidences,
+            x=mins[:, 0],
+            y=mins[:, 1],
+            w=maxs[:, 0] - mins[:, 0],
+            h=maxs[:, 1] - mins[:, 1],
+        )
+
+    def cleaned(self) -> OcrBlocks:
+        """Return a copy with clean_ocr_text applied to every text."""
+        return self._replace(texts=[clean_ocr_text(text) for text in self.texts])
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        """Convert to the per-block dicts returned by the API."""
+        confidences = self.confidences.tolist()
+        xs, ys, ws, hs = self.x.tolist(), self.y.tolist(), self.w.tolist(), self.h.tolist()
+        return [
+            {
+                "text": text,
+                "confidence": confidences[i],
+                "_x": xs[i],
+                "_y": ys[i],
+                "_w": ws[i],
+                "_h": hs[i],
+            }
+            for i, text in enumerate(self.texts)
+        ]
+
 
 # -----------------------------------------------------------------------------
 
@@ -51,51 +138,126 @@ if TYPE_CHECKING:
 # OpenCV Image Preprocessing for OCR Enhancement
 # -----------------------------------------------------------------------------
 
+# Deskew search runs on a downscaled binary mask; step is the angle resolution
+DESKEW_DOWNSCALE = 4
+DESKEW_STEP = 0.5
+# Sub-degree skew does not measurably affect recognition, so it is left alone
+DESKEW_MIN_ANGLE = 1.0
+
+# Denoising filter: bilateral (default), gaussian, nlm (slow non-local means) or off
+DENOISE_MODE = os.environ.get("DENOISE_MODE", "bilateral").lower()
+
+# Sharp, high-contrast captures skip denoise + CLAHE (measured on a copy whose
+# long side is QUALITY_PROBE_SIDE px). Raise either threshold to always preprocess.
+QUALITY_PROBE_SIDE = 640
+CLEAN_MIN_SHARPNESS = float(os.environ.get("PREPROCESS_CLEAN_MIN_SHARPNESS", "500"))
+CLEAN_MIN_CONTRAST = float(os.environ.get("PREPROCESS_CLEAN_MIN_CONTRAST", "50"))
+
+# Run denoise + CLAHE through OpenCV's transparent API (UMat) when an OpenCL
+# device is present; set OPENCV_UMAT=0 to keep everything on the CPU path
+USE_UMAT = os.environ.get("OPENCV_UMAT", "1") == "1" and cv2.ocl.haveOpenCL()
+
+# CLAHE objects keep scratch buffers between apply() calls, so share one per thread
+_clahe_cache = local()
+
 
-def preprocess_for_ocr(img: np.ndarray) -> np.ndarray:
+def get_clahe() -> cv2.CLAHE:
+    """Return this thread's cached CLAHE instance."""
+    clahe = getattr(_clahe_cache, "clahe", None)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        _clahe_cache.clahe = clahe
+    return clahe
+
+
+def is_clean_capture(gray: np.ndarray) -> bool:
+    """
+    Cheap quality check: is the image already sharp and high-contrast?
+
+    Sharpness is the variance of the Laplacian (blur flattens edges), contrast
+    the grayscale standard deviation; both on a small copy (~10 ms for 6 MP).
+    """
+    h, w = gray.shape
+    scale = QUALITY_PROBE_SIDE / max(h, w)
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    contrast = float(gray.std())
+    logger.info(f"[Preprocess] Quality: sharpness={sharpness:.0f}, contrast={contrast:.0f}")
+    return sharpness > CLEAN_MIN_SHARPNESS and contrast > CLEAN_MIN_CONTRAST
+
+
+def denoise(gray: Any) -> Any:
+    """
+    Denoise a grayscale image with the filter selected by DENOISE_MODE.
+
+    Bilateral is ~10x cheaper than non-local means on large receipts with no
+    measurable OCR accuracy loss on printed text; gaussian is cheaper still.
+    Unrecognized modes fall back to bilateral. Accepts and returns either a
+    numpy array or a cv2.UMat.
+    """
+    if DENOISE_MODE == "off":
+        return gray
+    if DENOISE_MODE == "gaussian":
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+    if DENOISE_MODE == "nlm":
+        return cv2.fastNlMeansDenoising(gray, h=10, templateWindowSize=7, searchWindowSize=21)
+    return cv2.bilateralFilter(gray, d=5, sigmaColor=50, sigmaSpace=50)
+
+
+def preprocess_for_ocr(gray: np.ndarray) -> np.ndarray:
     """
     Apply OpenCV preprocessing to improve OCR accuracy.
 
     Steps:
-    1. Convert to grayscale
-    2. Apply adaptive thresholding for better contrast
-    3. Denoise while preserving edges
-    4. Deskew if needed
+    1. Denoise while preserving edges
+    2. Enhance contrast (CLAHE)
+    3. Deskew if needed
 
     Args:
-        img: BGR image from cv2.imdecode
+        gray: Grayscale image from decode_image
 
     Returns:
         Preprocessed BGR image ready for OCR
     """
-    h, w = img.shape[:2]
+    h, w = gray.shape[:2]
     logger.info(f"[Preprocess] Input image: {w}x{h} pixels")
 
-    # Convert to grayscale for processing
-    logger.info("[Preprocess] Step 1/4: Converting to grayscale...")
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if is_clean_capture(gray):
+        # Already clean: denoise/CLAHE would cost time without helping OCR
+        logger.info("[Preprocess] Clean capture - skipping denoise and CLAHE, checking skew...")
+        deskewed = deskew_image(gray)
+        logger.info("[Preprocess] Complete - deskew only")
+        return cv2.cvtColor(deskewed, cv2.COLOR_GRAY2BGR)
 
     # Denoise while preserving edges
-    logger.info("[Preprocess] Step 2/4: Denoising (this may take a few seconds)...")
-    denoised = cv2.fastNlMeansDenoising(gray, h=10, templateWindowSize=7, searchWindowSize=21)
+    logger.info(f"[Preprocess] Step 1/3: Denoising ({DENOISE_MODE})...")
+    denoised = denoise(cv2.UMat(gray) if USE_UMAT else gray)  # type: ignore[call-overload]
 
     # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization)
-    logger.info("[Preprocess] Step 3/4: Enhancing contrast (CLAHE)...")
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    enhanced = clahe.apply(denoised)
+    logger.info("[Preprocess] Step 2/3: Enhancing contrast (CLAHE)...")
+    enhanced = get_clahe().apply(denoised)
+    if USE_UMAT:
+        # Deskew scores projection profiles in numpy, so download once here
+        enhanced = enhanced.get()
 
     # Detect and correct skew
-    logger.info("[Preprocess] Step 4/4: Detecting and correcting skew...")
+    logger.info("[Preprocess] Step 3/3: Detecting and correcting skew...")
     enhanced = deskew_image(enhanced)
 
     logger.info("[Preprocess] Complete - image ready for OCR")
-    # Convert back to BGR for PaddleOCR (it expects color images)
+    # Convert back to BGR for PaddleOCR (it expects 3-channel images). cvtColor is a
+    # single SIMD pass - faster than building the copy via np.broadcast_to or merge
     return cv2.cvtColor(enhanced, cv2.COLOR_GRAY2BGR)
 
 
 def deskew_image(gray: np.ndarray, max_angle: float = 10.0) -> np.ndarray:
     """
-    Detect and correct image skew using Hough transform.
+    Detect and correct image skew using a projection-profile search.
+
+    The text mask is binarized and downscaled, then rotated through candidate
+    angles; the angle whose horizontal projection is sharpest (text lines
+    collapse into tall peaks separated by empty rows) is the skew.
 
     Args:
         gray: Grayscale image
@@ -104,47 +266,138 @@ def deskew_image(gray: np.ndarray, max_angle: float = 10.0) -> np.ndarray:
     Returns:
         Deskewed grayscale image
     """
-    # Edge detection
-    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-
-    # Detect lines using Hough transform
-    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=100, minLineLength=100, maxLineGap=10)
-
-    if lines is None or len(lines) < 3:
-        return gray  # Not enough lines to determine skew
-
-    # Calculate angles of detected lines
-    # HoughLinesP returns numpy array of shape (N, 1, 4) containing [x1, y1, x2, y2]
-    angles = []
-    for line in lines:
-        x1, y1, x2, y2 = line[0]  # type: ignore[index]
-        if x2 - x1 != 0:  # Avoid division by zero
-            angle = np.degrees(np.arctan2(y2 - y1, x2 - x1))
-            # Only consider near-horizontal lines
-            if abs(angle) < max_angle:
-                angles.append(angle)
-
-    if not angles:
-        return gray
-
-    # Use median angle to avoid outliers
-    median_angle = float(np.median(angles))
-
-    if abs(median_angle) < 0.5:  # Skip if nearly straight
+    h, w = gray.shape
+    scale = DESKEW_DOWNSCALE if min(h, w) >= DESKEW_DOWNSCALE * 100 else 1
+    small = cv2.resize(gray, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+
+    # Text pixels become foreground (255) on a black background
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) == 0:
+        return gray  # Blank image - nothing to align
+
+    sh, sw = binary.shape
+    small_center = (sw / 2, sh / 2)
+    skew_angle = 0.0
+    best_score = -1.0
+    for angle in np.arange(-max_angle, max_angle + DESKEW_STEP, DESKEW_STEP):
+        matrix = cv2.getRotationMatrix2D(small_center, float(angle), 1.0)
+        rotated_small = cv2.warpAffine(binary, matrix, (sw, sh), flags=cv2.INTER_NEAREST)
+        row_sums = rotated_small.sum(axis=1, dtype=np.float64)
+        score = float(np.dot(row_sums, row_sums))
+        if score > best_score:
+            best_score = score
+            skew_angle = float(angle)
+
+    if abs(skew_angle) < DESKEW_MIN_ANGLE:  # Skip if nearly straight
         return gray
 
-    # Rotate to correct skew
-    h, w = gray.shape
+    # Rotate to correct skew at full resolution
     center = (w // 2, h // 2)
-    rotation_matrix = cv2.getRotationMatrix2D(center, median_angle, 1.0)
+    rotation_matrix = cv2.getRotationMatrix2D(center, skew_angle, 1.0)
     rotated = cv2.warpAffine(
-        gray, rotation_matrix, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE
+        gray, rotation_matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
     )
 
-    logger.debug(f"Deskewed image by {median_angle:.2f} degrees")
+    logger.debug(f"Deskewed image by {skew_angle:.2f} degrees")
     return rotated
 
 
+# Large uploads are decoded at half resolution (libjpeg scales during the IDCT)
+# when the full image would still exceed REDUCED_DECODE_MIN_PIXELS
+REDUCED_DECODE_MIN_BYTES = 2 * 1024 * 1024
+REDUCED_DECODE_MIN_PIXELS = 4_000_000
+
+# Images are shrunk to this long side before preprocessing; PaddleOCR's detector is
+# given the same limit, so nothing larger would ever reach it. 1280 roughly quarters
+# detector cost at some small-print accuracy cost on long receipts.
+OCR_MAX_SIDE = int(os.environ.get("OCR_MAX_SIDE", "2560"))
+
+
+def sniff_image_format(header: bytes) -> str | None:
+    """Identify an allowed image format from its first 12 bytes, or None."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def read_upload(stream: IO[bytes]) -> np.ndarray | None:
+    """
+    Read an uploaded image into a uint8 array.
+
+    The magic bytes are checked before anything else is read, so non-image
+    uploads are rejected without buffering them. Image data is streamed in
+    chunks into a buffer sized up front, which NumPy then wraps without copying.
+
+    Returns:
+        The encoded image bytes, or None if the upload is not an allowed format
+    """
+    header = stream.read(12)
+    if sniff_image_format(header) is None:
+        return None
+
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    while offset < size:
+        chunk = stream.read(min(UPLOAD_CHUNK_SIZE, size - offset))
+        if not chunk:
+            break
+        view[offset : offset + len(chunk)] = chunk
+        offset += len(chunk)
+
+    return np.frombuffer(buf, np.uint8, count=offset)
+
+
+def decode_image(data: np.ndarray) -> tuple[np.ndarray | None, float]:
+    """
+    Decode an uploaded image to grayscale, halving huge photos during decode.
+
+    Preprocessing only ever works on luminance, so decoding straight to one
+    channel skips both the colour decode and a BGR-to-gray pass.
+
+    Args:
+        data: Encoded image bytes as a uint8 array
+
+    Returns:
+        (image, scale) where scale maps decoded pixels back to the original
+        image, or (None, 1.0) if the data is not a decodable image
+    """
+    if data.size >= REDUCED_DECODE_MIN_BYTES:
+        reduced = cv2.imdecode(data, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+        if reduced is not None and reduced.shape[0] * reduced.shape[1] * 4 > (
+            REDUCED_DECODE_MIN_PIXELS
+        ):
+            h, w = reduced.shape[:2]
+            logger.info(f"[Decode] Large image - decoded at half resolution ({w}x{h})")
+            return reduced, 2.0
+
+    return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE), 1.0
+
+
+def fit_to_max_side(img: np.ndarray, max_side: int) -> tuple[np.ndarray, float]:
+    """
+    Shrink an image so its long side is at most max_side pixels.
+
+    Returns:
+        (image, scale) where scale maps the returned pixels back to the input
+    """
+    h, w = img.shape[:2]
+    longest = max(h, w)
+    if longest <= max_side:
+        return img, 1.0
+    factor = max_side / longest
+    resized = cv2.resize(img, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    logger.info(f"[Decode] Resized {w}x{h} to {resized.shape[1]}x{resized.shape[0]} for OCR")
+    return resized, longest / max_side
+
+
 # -----------------------------------------------------------------------------
 # Layout Analysis - Column-First Algorithm (from Docker-OCR-2)
 # -----------------------------------------------------------------------------
@@ -156,9 +409,13 @@ def deskew_image(gray: np.ndarray, max_angle: float = 10.0) -> np.ndarray:
 # -----------------------------------------------------------------------------
 
 
-def analyze_layout_column_first(
-    blocks: list[dict[str, Any]],
-) -> dict[str, Any]:
+def upper_median(values: np.ndarray) -> float:
+    """Return the upper median (element at index n // 2 once sorted) in O(n)."""
+    k = len(values) // 2
+    return float(np.partition(values, k)[k])
+
+
+def analyze_layout_column_first(blocks: OcrBlocks) -> dict[str, Any]:
     """
     Column-first layout analysis for multi-column documents.
 
@@ -169,12 +426,13 @@ def analyze_layout_column_first(
     4. Builds table where row N = Nth card from each column
 
     Args:
-        blocks: List of OCR blocks with _x, _y, _w, _h coordinates
+        blocks: OCR blocks with _x, _y, _w, _h coordinate arrays and texts
+            already passed through clean_ocr_text (see OcrBlocks.cleaned)
 
     Returns:
         Layout analysis with table_rows, column_count, row_count, raw_text
     """
-    if not blocks:
+    if not blocks.texts:
         return {
             "table_rows": [],
             "column_count": 0,
@@ -184,98 +442,63 @@ def analyze_layout_column_first(
         }
 
     # Calculate median dimensions for thresholds
-    heights = [b["_h"] for b in blocks]
-    widths = [b["_w"] for b in blocks]
-    median_height = sorted(heights)[len(heights) // 2] if heights else 30
-    median_width = sorted(widths)[len(widths) // 2] if widths else 100
+    median_height = upper_median(blocks.h)
+    median_width = upper_median(blocks.w)
 
     # STEP 1: Detect column boundaries using X-gap analysis
-    all_x_starts = sorted({int(b["_x"]) for b in blocks})
-
-    x_gaps: list[tuple[int, int]] = []
-    for i in range(1, len(all_x_starts)):
-        gap = all_x_starts[i] - all_x_starts[i - 1]
-        x_gaps.append((gap, all_x_starts[i]))
+    x_starts = np.unique(blocks.x.astype(np.int64))
+    x_gaps = np.diff(x_starts)  # x_gaps[i] is the gap just before x_starts[i + 1]
 
-    col_boundaries = [all_x_starts[0]] if all_x_starts else [0]
-
-    if x_gaps:
-        gap_values = sorted([g[0] for g in x_gaps], reverse=True)
+    col_boundaries = x_starts[:1]
 
+    if x_gaps.size:
         # Adaptive threshold: use statistical outlier detection for column gaps
         # Column gaps are typically much larger than word gaps
-        if len(gap_values) >= 3:
+        if x_gaps.size >= 3:
             # Use median gap as baseline - gaps > 3x median are column separators
-            median_gap = sorted(gap_values)[len(gap_values) // 2]
+            median_gap = upper_median(x_gaps)
             gap_threshold = max(median_gap * 3, median_width * 0.8, 100)
         else:
             # Fallback for few gaps: use adaptive minimum
             gap_threshold = max(median_width * 1.0, 150)
 
-        logger.debug(f"X gaps (largest 5): {gap_values[:5]}, threshold: {gap_threshold:.0f}px")
+        largest_gaps = np.sort(x_gaps)[::-1][:5].tolist()
+        logger.debug(f"X gaps (largest 5): {largest_gaps}, threshold: {gap_threshold:.0f}px")
 
-        for gap_size, x_pos in x_gaps:
-            if gap_size >= gap_threshold:
-                col_boundaries.append(x_pos)
-        col_boundaries.sort()
+        col_boundaries = np.concatenate((x_starts[:1], x_starts[1:][x_gaps >= gap_threshold]))
 
     num_cols = len(col_boundaries)
-    logger.debug(f"Column boundaries ({num_cols}): {col_boundaries}")
+    logger.debug(f"Column boundaries ({num_cols}): {col_boundaries.tolist()}")
 
     # STEP 2: Assign each block to a column
-    columns: dict[int, list[dict[str, Any]]] = {i: [] for i in range(num_cols)}
-    for block in blocks:
-        block_x = block["_x"]
-        col_idx = 0
-        for i, col_x in enumerate(col_boundaries):
-            if block_x >= col_x - 50:  # Allow some tolerance
-                col_idx = i
-        columns[col_idx].append(block)
+    # Column = last boundary at or left of the block start (with 50px tolerance)
+    bounds = col_boundaries.astype(np.float64) - 50
+    block_cols = np.clip(np.searchsorted(bounds, blocks.x, side="right") - 1, 0, num_cols - 1)
+    columns = [np.flatnonzero(block_cols == i) for i in range(num_cols)]
 
-    logger.debug(f"Blocks per column: {[len(columns[i]) for i in range(num_cols)]}")
+    logger.debug(f"Blocks per column: {[len(col) for col in columns]}")
 
     # STEP 3: Cluster blocks within each column into cards using Y-gaps
     y_gap_threshold = median_height * 1.2
 
-    def cluster_column_blocks(col_blocks: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
-        """Cluster text blocks within a column into separate cards."""
-        if not col_blocks:
+    def cluster_column_blocks(col_indices: np.ndarray) -> list[np.ndarray]:
+        """Cluster text blocks within a column into separate cards of block indices."""
+        if len(col_indices) == 0:
             return []
 
-        sorted_blocks = sorted(col_blocks, key=lambda b: b["_y"])
-        y_positions = [(b["_y"], b["_y"] + b["_h"], b) for b in sorted_blocks]
-
-        cards: list[list[dict[str, Any]]] = []
-        current_card: list[dict[str, Any]] = [y_positions[0][2]]
-        current_y_max = y_positions[0][1]
-
-        for y_min, y_max, block in y_positions[1:]:
-            gap = y_min - current_y_max
-            if gap >= y_gap_threshold:
-                # New card - significant vertical gap
-                cards.append(current_card)
-                current_card = [block]
-                current_y_max = y_max
-            else:
-                # Same card
-                current_card.append(block)
-                current_y_max = max(current_y_max, y_max)
-
-        if current_card:
-            cards.append(current_card)
+        sorted_indices = col_indices[np.argsort(blocks.y[col_indices], kind="stable")]
+        y_mins = blocks.y[sorted_indices]
+        y_maxs = y_mins + blocks.h[sorted_indices]
 
-        return cards
+        # New card wherever a block starts a significant gap below everything above it
+        gaps = y_mins[1:] - np.maximum.accumulate(y_maxs)[:-1]
+        card_starts = np.flatnonzero(gaps >= y_gap_threshold) + 1
+        return np.split(sorted_indices, card_starts)
 
-    column_cards: dict[int, list[list[dict[str, Any]]]] = {}
-    max_cards_per_col = 0
-    for col_idx in range(num_cols):
-        cards = cluster_column_blocks(columns[col_idx])
-        column_cards[col_idx] = cards
-        max_cards_per_col = max(max_cards_per_col, len(cards))
+    column_cards = [cluster_column_blocks(col) for col in columns]
+    num_rows = max(len(cards) for cards in column_cards)
 
-    logger.debug(f"Cards per column: {[len(column_cards[i]) for i in range(num_cols)]}")
-
-    num_rows = max_cards_per_col
+    logger.debug(f"Cards per column: {[len(cards) for cards in column_cards]}")
     logger.info(f"Layout: {num_cols} columns x {num_rows} rows")
 
     # STEP 4: Build table - each row is the Nth card from each column
@@ -290,13 +513,13 @@ def analyze_layout_column_first(
         for col_idx in range(num_cols):
             cards = column_cards[col_idx]
             if row_idx < len(cards):
-                card_blocks = cards[row_idx]
+                card = cards[row_idx]
                 # Sort blocks within card by Y then X for reading order
-                sorted_card = sorted(card_blocks, key=lambda b: (b["_y"], b["_x"]))
-                raw_card_text = " ".join([b["text"] for b in sorted_card])
-                # Apply OCR text cleaning
-                card_text = clean_ocr_text(raw_card_text)
-                card_conf = max([b["confidence"] for b in sorted_card]) if sorted_card else 0.0
+                sorted_card = card[np.lexsort((blocks.x[card], blocks.y[card]))]
+                # Texts are already cleaned (trimmed, single-spaced); skip empty ones
+                # so joining does not reintroduce double spaces
+                card_text = " ".join([t for i in sorted_card.tolist() if (t := blocks.texts[i])])
+                card_conf = float(blocks.confidences[card].max())
                 row_cells[col_idx] = card_text
                 row_confidences[col_idx] = card_conf
 
@@ -344,6 +567,21 @@ def analyze_layout_column_first(
 MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB max file size
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "webp", "tiff", "tif"}
 
+# Magic-byte prefixes of ALLOWED_EXTENSIONS formats (WebP is checked separately:
+# "RIFF" + 4-byte size + "WEBP")
+IMAGE_SIGNATURES: dict[bytes, str] = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpeg",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+    b"BM": "bmp",
+    b"II*\x00": "tiff",
+    b"MM\x00*": "tiff",
+}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Rows fetched per round-trip from the /scans/export server-side cursor
+EXPORT_BATCH_SIZE = 500
+
 # PostgreSQL configuration - use environment variables
 DB_CONFIG = {
     "host": os.environ.get("POSTGRES_HOST", "localhost"),
@@ -351,8 +589,15 @@ DB_CONFIG = {
     "database": os.environ.get("POSTGRES_DB", "receipts_ocr"),
     "user": os.environ.get("POSTGRES_USER", "postgres"),
     "password": os.environ.get("POSTGRES_PASSWORD", "postgres"),
+    # Fail fast (and answer 503) instead of hanging a worker thread on an
+    # unreachable host until the OS TCP timeout
+    "connect_timeout": os.environ.get("POSTGRES_CONNECT_TIMEOUT", "5"),
 }
 
+# Connection pool bounds - gunicorn runs 1 worker x 4 threads, plus SSE/log polling
+DB_POOL_MIN_CONNECTIONS = int(os.environ.get("DB_POOL_MIN_CONNECTIONS", "2"))
+DB_POOL_MAX_CONNECTIONS = int(os.environ.get("DB_POOL_MAX_CONNECTIONS", "10"))
+
 # Configure logging - use stderr so gunicorn captures it with --capture-output
 handler = logging.StreamHandler(sys.stderr)
 handler.setLevel(logging.INFO)
@@ -410,6 +655,9 @@ for paddle_logger_name in ["paddle", "paddleocr", "ppocr", "urllib3"]:
 # -----------------------------------------------------------------------------
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = MAX_CONTENT_LENGTH
+# orjson serializes the OCR block lists and RealDictRow rows several times
+# faster than the stdlib encoder behind Flask's default provider
+app.json = OrjsonProvider(app)
 
 # CORS: Allow all origins for development
 CORS(
@@ -423,6 +671,14 @@ CORS(
     },
 )
 
+# Compress JSON responses for clients that accept it; OCR results repeat the same
+# field names for every block and shrink several-fold. Small bodies (health checks,
+# single-scan lookups) aren't worth the CPU or the extra header.
+app.config["COMPRESS_MIMETYPES"] = ["application/json", "text/csv"]
+app.config["COMPRESS_MIN_SIZE"] = 2048
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+Compress(app)
+
 # -----------------------------------------------------------------------------
 # Receipt-specific OCR Text Cleaning
 # -----------------------------------------------------------------------------
@@ -444,15 +700,27 @@ OCR_CORRECTIONS = {
 }
 
 # Regex patterns for price extraction
-PRICE_PATTERN = re.compile(r"\$?\d+[.,]\d{2}")
+# Price pattern: matches $12.34, 12.34, 12,34 (comma decimal separator), etc.
+# ASCII-only \d skips the Unicode digit tables on every block
+PRICE_PATTERN = re.compile(r"\$?\d+[.,]\d{2}", re.ASCII)
 QTY_PATTERN = re.compile(r"^\d+\s*[xX@]\s*")
 PATTERN_AMPERSAND = re.compile(r"(\w)&(\w)")
+PATTERN_MULTI_SPACE = re.compile(r" {2,}")
+
+# All dictionary corrections in one alternation (longest first, so "ltems" wins over "ltem")
+OCR_CORRECTIONS_PATTERN = re.compile(
+    "|".join(
+        re.escape(wrong)
+        for wrong in sorted(OCR_CORRECTIONS, key=len, reverse=True)
+        if OCR_CORRECTIONS[wrong] != wrong
+    )
+)
 
-# Regex-based corrections for spacing issues
+# Regex-based corrections for spacing issues, applied in order (each pass sees the
+# previous one's output, so only alternatives that cannot interact share a pattern)
 REGEX_CORRECTIONS: list[tuple[re.Pattern[str], str]] = [
     # Number followed by common words without space
-    (re.compile(r"(\d)(Items?)\b", re.IGNORECASE), r"\1 \2"),
-    (re.compile(r"(\d)(Units?)\b", re.IGNORECASE), r"\1 \2"),
+    (re.compile(r"(\d)(Items?|Units?)\b", re.IGNORECASE), r"\1 \2"),
     # Closing paren followed by capital letter without space
     (re.compile(r"\)([A-Z][a-z]{2,})"), r") \1"),
     # Lowercase followed by common words without space
@@ -462,20 +730,15 @@ REGEX_CORRECTIONS: list[tuple[re.Pattern[str], str]] = [
 ]
 
 
-# Price pattern: matches $12.34, 12.34, etc.
-PRICE_PATTERN = re.compile(r"\$?\d+\.\d{2}")
-
-
+@lru_cache(maxsize=4096)
 def clean_ocr_text(text: str) -> str:
     """Apply OCR text cleaning based on llm_notes patterns."""
     if not text:
         return text
     cleaned = text
 
-    # Step 1: Dictionary-based corrections
-    for wrong, correct in OCR_CORRECTIONS.items():
-        if wrong in cleaned:
-            cleaned = cleaned.replace(wrong, correct)
+    # Step 1: Dictionary-based corrections (single scan for all entries)
+    cleaned = OCR_CORRECTIONS_PATTERN.sub(lambda m: OCR_CORRECTIONS[m.group()], cleaned)
 
     # Step 2: Regex-based corrections for spacing
     for pattern, replacement in REGEX_CORRECTIONS:
@@ -485,81 +748,212 @@ def clean_ocr_text(text: str) -> str:
     cleaned = PATTERN_AMPERSAND.sub(r"\1 & \2", cleaned)
 
     # Step 4: Normalize multiple spaces
-    cleaned = re.sub(r" {2,}", " ", cleaned)
+    cleaned = PATTERN_MULTI_SPACE.sub(" ", cleaned)
     return cleaned.strip()
 
 
+def parse_price(match: re.Match[str]) -> float | None:
+    """Convert a PRICE_PATTERN match to a float."""
+    price_str = match.group().replace("$", "").replace(",", ".")
+    try:
+        return float(price_str)
+    except ValueError:
+        return None
+
+
 def extract_price(text: str) -> float | None:
     """Extract price from text string."""
     match = PRICE_PATTERN.search(text)
-    if match:
-        price_str = match.group().replace("$", "").replace(",", "")
-        try:
-            return float(price_str)
-        except ValueError:
-            return None
-    return None
+    return parse_price(match) if match else None
 
 
 # -----------------------------------------------------------------------------
 # Database Functions
 # -----------------------------------------------------------------------------
+db_pool: ThreadedConnectionPool | None = None
+db_pool_lock = Lock()
+
+# After a failed connect, answer "database unavailable" immediately for a
+# moment instead of making every request wait on its own connect attempt
+DB_RETRY_INTERVAL_SECONDS = 1.0
+db_down_until = float("-inf")
+
+# Hot per-id queries, PREPAREd once per pooled connection so PostgreSQL
+# parses and plans them once instead of on every request
+PREPARED_STATEMENTS = {
+    "get_scan": "SELECT id, filename, raw_text, created_at FROM scans WHERE id = $1",
+    "delete_scan": "DELETE FROM scans WHERE id = $1",
+}
+
+
+class PreparedConnection(connection):
+    """psycopg2 connection that remembers which PREPARED_STATEMENTS it has prepared."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+
+
+def execute_prepared(cur: cursor, name: str, params: tuple[Any, ...]) -> None:
+    """
+    EXECUTE a statement from PREPARED_STATEMENTS, preparing it on first use.
+
+    Prepared statements live for the whole session and survive rollbacks,
+    so each pooled connection only pays for the PREPARE once.
+    """
+    conn = cast(PreparedConnection, cur.connection)
+    if name not in conn.prepared_statements:
+        cur.execute(f"PREPARE {name} AS {PREPARED_STATEMENTS[name]}")
+        conn.prepared_statements.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    cur.execute(f"EXECUTE {name} ({placeholders})", params)
+
+
+def get_db_pool() -> ThreadedConnectionPool:
+    """
+    Get the shared connection pool, creating it on first use.
+
+    Created lazily so the backend can start (and recover) while PostgreSQL
+    is still coming up. Raises psycopg2.Error if the database is unreachable.
+    """
+    global db_pool
+    with db_pool_lock:
+        if db_pool is None:
+            db_pool = ThreadedConnectionPool(
+                DB_POOL_MIN_CONNECTIONS,
+                DB_POOL_MAX_CONNECTIONS,
+                connection_factory=PreparedConnection,
+                cursor_factory=RealDictCursor,
+                **DB_CONFIG,
+            )
+        return db_pool
+
+
+@atexit.register
+def close_db_pool() -> None:
+    """Close pooled connections on interpreter exit so PostgreSQL sees clean disconnects."""
+    with db_pool_lock:
+        if db_pool is not None and not db_pool.closed:
+            db_pool.closeall()
+
+
 def get_db_connection() -> connection | None:
-    """Get PostgreSQL connection."""
+    """Get a pooled PostgreSQL connection; hand it back with release_db_connection()."""
+    global db_down_until
+    if time_module.monotonic() < db_down_until:
+        return None
+
     try:
-        conn = psycopg2.connect(**DB_CONFIG, cursor_factory=RealDictCursor)  # type: ignore[call-overload]
+        pool = get_db_pool()
+        conn = pool.getconn()
+        if conn.closed:
+            # Server restarted or dropped us - discard and open a fresh one
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
         return conn
+    except psycopg2.OperationalError as e:
+        db_down_until = time_module.monotonic() + DB_RETRY_INTERVAL_SECONDS
+        logger.error(f"Database connection failed: {e}")
+        return None
     except psycopg2.Error as e:
         logger.error(f"Database connection failed: {e}")
         return None
 
 
-def init_database() -> bool:
-    """Initialize database tables."""
-    conn = get_db_connection()
-    if not conn:
-        logger.warning("Could not connect to PostgreSQL - database features disabled")
-        return False
+def release_db_connection(conn: connection) -> None:
+    """Return a connection to the pool (rolls back any open transaction)."""
+    if db_pool is not None:
+        db_pool.putconn(conn)
+    else:
+        conn.close()
+
 
+@contextmanager
+def db_connection() -> Iterator[connection | None]:
+    """
+    Borrow a pooled connection for a with-block and always hand it back.
+
+    Yields None when the database is unavailable, so callers can answer 503.
+    """
+    conn = get_db_connection()
     try:
-        with conn.cursor() as cur:
-            # Simple schema: just store filename, raw OCR text, and timestamp
-            # No receipt-specific fields - this is a general-purpose OCR tool
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS scans (
-                    id SERIAL PRIMARY KEY,
-                    filename VARCHAR(255),
-                    raw_text TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            conn.commit()
-        logger.info("Database tables initialized successfully")
-        return True
-    except psycopg2.Error as e:
-        logger.error(f"Database initialization failed: {e}")
-        return False
+        yield conn
     finally:
-        conn.close()
+        if conn is not None:
+            release_db_connection(conn)
+
+
+def init_database() -> bool:
+    """Initialize database tables."""
+    with db_connection() as conn:
+        if not conn:
+            logger.warning("Could not connect to PostgreSQL - database features disabled")
+            return False
+
+        try:
+            with conn.cursor() as cur:
+                # Simple schema: just store filename, raw OCR text, and timestamp
+                # No receipt-specific fields - this is a general-purpose OCR tool
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS scans (
+                        id SERIAL PRIMARY KEY,
+                        filename VARCHAR(255),
+                        raw_text TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+                """)
+                # Newest-first reads (export's server-side cursor) walk this index
+                # and stream rows in order instead of sorting the table up front
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_scans_created_at
+                    ON scans (created_at DESC);
+                """)
+                conn.commit()
+            logger.info("Database tables initialized successfully")
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Database initialization failed: {e}")
+            return False
 
 
 # -----------------------------------------------------------------------------
 # PaddleOCR Engine - based on llm_notes/technologies_used.md
 # -----------------------------------------------------------------------------
+# Paddle's CPU kernels (MKL-DNN/OpenMP) parallelize inference across this many threads
+OCR_CPU_THREADS = int(os.environ.get("OCR_CPU_THREADS", str(os.cpu_count() or 4)))
+# High-performance inference lets PaddleOCR pick OpenVINO/ONNX Runtime backends;
+# it needs the optional HPI plugin (`paddleocr install_hpi_deps cpu`)
+OCR_ENABLE_HPI = os.environ.get("OCR_ENABLE_HPI", "0") == "1"
+# Text lines recognized per forward pass. On CPU larger batches mostly add padding
+# and grow Paddle's memory arenas; concurrency comes from request batching instead
+OCR_REC_BATCH_SIZE = int(os.environ.get("OCR_REC_BATCH_SIZE", "1"))
+
+
 def init_ocr_engine() -> PaddleOCR | None:
     """Initialize PaddleOCR with CPU-optimized settings."""
+    # New PaddleOCR API (v3+)
+    options: dict[str, Any] = {
+        "lang": "en",
+        "use_doc_orientation_classify": False,  # Rotation handled elsewhere
+        "use_doc_unwarping": False,
+        "use_textline_orientation": False,
+        "text_det_limit_side_len": OCR_MAX_SIDE,
+        "text_det_limit_type": "max",
+        "text_det_thresh": 0.3,
+        "text_det_box_thresh": 0.5,
+        "text_recognition_batch_size": OCR_REC_BATCH_SIZE,
+        "cpu_threads": OCR_CPU_THREADS,
+    }
+    if OCR_ENABLE_HPI:
+        try:
+            engine = PaddleOCR(**options, enable_hpi=True)
+            logger.info("PaddleOCR initialized with high-performance inference")
+            return engine
+        except Exception as e:
+            logger.warning(f"High-performance inference unavailable, using Paddle Inference: {e}")
+
     try:
-        # New PaddleOCR API (v3+)
-        engine = PaddleOCR(
-            lang="en",
-            use_doc_orientation_classify=False,  # Rotation handled elsewhere
-            use_doc_unwarping=False,
-            use_textline_orientation=False,
-            text_det_limit_side_len=2560,
-            text_det_limit_type="max",
-            text_det_thresh=0.3,
-            text_det_box_thresh=0.5,
-        )
+        engine = PaddleOCR(**options)
         logger.info("PaddleOCR initialized successfully")
         return engine
     except Exception as e:
@@ -569,6 +963,94 @@ def init_ocr_engine() -> PaddleOCR | None:
 
 ocr = init_ocr_engine()
 
+# Inference runs on one dedicated thread: the PaddleOCR predictor is not safe to
+# call from gunicorn's request threads concurrently, and funnelling through a
+# queue lets requests that arrive together share one predict() call while the
+# request threads keep decoding/preprocessing the next images in parallel.
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE", "4"))
+OCR_BATCH_WAIT_SECONDS = float(os.environ.get("OCR_BATCH_WAIT_MS", "0")) / 1000
+# A request gives up on its queued/running inference after this long (kept under
+# gunicorn's 120s timeout so the client gets an error rather than a dropped socket)
+OCR_TIMEOUT_SECONDS = float(os.environ.get("OCR_TIMEOUT_SECONDS", "110"))
+
+
+class OcrJob(NamedTuple):
+    """A preprocessed image waiting for inference, and where to deliver its result."""
+
+    image: np.ndarray
+    future: Future[Any]
+
+
+ocr_queue: Queue[OcrJob] = Queue()
+
+
+def run_ocr_batch(batch: list[OcrJob]) -> None:
+    """Run one predict() call for a batch; on failure, retry images one by one."""
+    try:
+        results = list(ocr.predict([job.image for job in batch]))  # type: ignore[union-attr]
+    except Exception as e:
+        if len(batch) == 1:
+            batch[0].future.set_exception(e)
+            return
+        # Don't let one bad image fail the requests it happened to be batched with
+        for job in batch:
+            run_ocr_batch([job])
+        return
+
+    for i, job in enumerate(batch):
+        job.future.set_result(results[i] if i < len(results) else None)
+
+
+def warm_up_ocr() -> None:
+    """Run one throwaway inference so the first real request skips PaddleOCR's lazy setup."""
+    image = np.full((160, 640, 3), 255, dtype=np.uint8)
+    cv2.putText(image, "WARMUP 12.34", (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 3)
+    start = time_module.monotonic()
+    try:
+        ocr.predict([image])  # type: ignore[union-attr]
+        logger.info(f"PaddleOCR warm-up finished in {time_module.monotonic() - start:.1f}s")
+    except Exception as e:
+        logger.warning(f"PaddleOCR warm-up failed: {e}")
+
+
+def ocr_worker() -> None:
+    """Take queued jobs, batching up to OCR_BATCH_SIZE that arrive within the wait window."""
+    # Warm up here rather than at import so gunicorn can start serving /health meanwhile;
+    # requests that arrive early simply queue behind it
+    warm_up_ocr()
+    while True:
+        batch = [ocr_queue.get()]
+        deadline = time_module.monotonic() + OCR_BATCH_WAIT_SECONDS
+        while len(batch) < OCR_BATCH_SIZE:
+            try:
+                batch.append(ocr_queue.get(timeout=max(0.0, deadline - time_module.monotonic())))
+            except Empty:
+                break
+        # Drop jobs whose request already timed out; the rest can no longer be cancelled
+        batch = [job for job in batch if job.future.set_running_or_notify_cancel()]
+        if batch:
+            run_ocr_batch(batch)
+
+
+def recognize(image: np.ndarray) -> Any:
+    """
+    Queue an image for the OCR worker and wait for its PaddleOCR result.
+
+    Raises FutureTimeoutError after OCR_TIMEOUT_SECONDS; a job that has not
+    started by then is withdrawn from the queue.
+    """
+    future: Future[Any] = Future()
+    ocr_queue.put(OcrJob(image, future))
+    try:
+        return future.result(timeout=OCR_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+
+if ocr is not None:
+    Thread(target=ocr_worker, name="ocr-worker", daemon=True).start()
+
 # Initialize database at module load (for gunicorn which imports module, not runs __main__)
 init_database()
 
@@ -576,11 +1058,12 @@ init_database()
 # -----------------------------------------------------------------------------
 # OCR Text Parsing Logic
 # -----------------------------------------------------------------------------
-def parse_receipt_text(blocks: list[dict[str, Any]]) -> dict[str, Any]:
+def parse_receipt_text(blocks: OcrBlocks) -> dict[str, Any]:
     """Parse OCR blocks into structured data.
 
     Now generic - captures all text lines as items, not just those with prices.
     This works for receipts, invoices, bid sheets, or any document.
+    Block texts must already be cleaned with clean_ocr_text (see OcrBlocks.cleaned).
     """
     items: list[dict[str, Any]] = []
     subtotal: float | None = None
@@ -588,8 +1071,8 @@ def parse_receipt_text(blocks: list[dict[str, Any]]) -> dict[str, Any]:
     total: float | None = None
     store_name: str | None = None
 
-    # Sort blocks by Y position (top to bottom)
-    sorted_blocks = sorted(blocks, key=lambda b: b.get("_y", 0))
+    # Visit blocks by Y position (top to bottom)
+    order = np.argsort(blocks.y, kind="stable").tolist()
 
     # Keywords to exclude from items (metadata, not content)
     exclude_keywords = ["subtotal", "tax", "total", "change", "cash", "card", "credit", "debit"]
@@ -597,15 +1080,18 @@ def parse_receipt_text(blocks: list[dict[str, Any]]) -> dict[str, Any]:
     # Minimum text length to be considered an item (filter noise)
     MIN_ITEM_LENGTH = 3
 
-    for block in sorted_blocks:
-        text = clean_ocr_text(block.get("text", ""))
-        text_lower = text.lower()
-        price = extract_price(text)
+    for i in order:
+        text = blocks.texts[i]
 
         # Skip very short text (likely noise or single characters)
-        if len(text.strip()) < MIN_ITEM_LENGTH:
+        if len(text) < MIN_ITEM_LENGTH:
             continue
 
+        # One search gives both the price and where it sits in the text
+        price_match = PRICE_PATTERN.search(text)
+        price = parse_price(price_match) if price_match else None
+        text_lower = text.lower()
+
         # Detect totals (receipt-specific, but keep for backwards compatibility)
         if "subtotal" in text_lower and price:
             subtotal = price
@@ -615,8 +1101,15 @@ def parse_receipt_text(blocks: list[dict[str, Any]]) -> dict[str, Any]:
             total = price
         elif text and not any(x in text_lower for x in exclude_keywords):
             # Capture as item - with or without price
-            # Remove price from text to get item name
-            item_name = PRICE_PATTERN.sub("", text).strip()
+            # Remove price(s) from text to get item name - text before the first
+            # match is already known to be price-free
+            if price_match:
+                item_name = text[: price_match.start()] + PRICE_PATTERN.sub(
+                    "", text[price_match.end() :]
+                )
+                item_name = item_name.strip()
+            else:
+                item_name = text
             if item_name and len(item_name) >= MIN_ITEM_LENGTH:
                 items.append(
                     {
@@ -646,11 +1139,36 @@ def parse_receipt_text(blocks: list[dict[str, Any]]) -> dict[str, Any]:
 # Backend version - increment when making breaking changes
 BACKEND_VERSION = "1.0.0"
 
+# /health is polled by the frontend and Docker - reuse the DB probe result briefly
+HEALTH_DB_CACHE_SECONDS = 10.0
+health_db_cache: dict[str, Any] = {"checked_at": float("-inf"), "status": "disconnected"}
+
+
+def check_database_status() -> str:
+    """Probe the database with SELECT 1 on a pooled connection, cached for a few seconds."""
+    now = time_module.monotonic()
+    if now - health_db_cache["checked_at"] < HEALTH_DB_CACHE_SECONDS:
+        return str(health_db_cache["status"])
+
+    status = "disconnected"
+    with db_connection() as conn:
+        if conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                status = "connected"
+            except psycopg2.Error as e:
+                logger.warning(f"Database health probe failed: {e}")
+
+    health_db_cache["checked_at"] = now
+    health_db_cache["status"] = status
+    return status
+
 
 @app.route("/health", methods=["GET"])
 def health() -> Response:
     """Health check endpoint."""
-    db_status = "connected" if get_db_connection() else "disconnected"
+    db_status = check_database_status()
     return jsonify(
         {
             "status": "healthy",
@@ -817,92 +1335,118 @@ def network_diagnostics() -> Response:
 @app.route("/stats", methods=["GET"])
 def get_stats() -> tuple[Response, int] | Response:
     """Get database statistics - scan count, dates, etc."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database not available"}), 503
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database not available"}), 503
 
-    try:
-        with conn.cursor() as cur:
-            # Get scan count and date range
-            cur.execute("""
-                SELECT
-                    COUNT(*) as scan_count,
-                    MIN(created_at) as oldest,
-                    MAX(created_at) as newest
-                FROM scans
-            """)
-            stats = cur.fetchone()
-
-        # Convert RealDictRow to dict for mypy
-        stats_dict: dict[str, Any] = dict(stats) if stats else {}
-        oldest = stats_dict.get("oldest")
-        newest = stats_dict.get("newest")
-        return jsonify(
-            {
-                "scan_count": stats_dict.get("scan_count", 0),
-                "oldest_scan": oldest.isoformat() if oldest else None,
-                "newest_scan": newest.isoformat() if newest else None,
-                "database": "PostgreSQL",
-                "status": "connected",
-            }
-        )
-    except psycopg2.Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+        try:
+            with conn.cursor() as cur:
+                # Get scan count and date range
+                cur.execute("""
+                    SELECT
+                        COUNT(*) as scan_count,
+                        MIN(created_at) as oldest,
+                        MAX(created_at) as newest
+                    FROM scans
+                """)
+                stats = cur.fetchone()
+
+            # RealDictCursor rows are already dicts - the stubs just type them as tuples
+            stats_dict = cast("dict[str, Any]", stats) if stats else {}
+            oldest = stats_dict.get("oldest")
+            newest = stats_dict.get("newest")
+            return jsonify(
+                {
+                    "scan_count": stats_dict.get("scan_count", 0),
+                    "oldest_scan": oldest.isoformat() if oldest else None,
+                    "newest_scan": newest.isoformat() if newest else None,
+                    "database": "PostgreSQL",
+                    "status": "connected",
+                }
+            )
+        except psycopg2.Error as e:
+            return jsonify({"error": str(e)}), 500
 
 
 @app.route("/scans/export", methods=["GET"])
 def export_scans() -> tuple[Response, int] | Response:
-    """Export all scans as JSON or CSV."""
+    """
+    Export all scans as JSON or CSV.
+
+    Rows are read through a server-side (named) cursor and streamed out in
+    batches, so memory stays flat no matter how many scans are stored.
+    """
+    import csv
+    import io
+
     export_format = request.args.get("format", "json").lower()
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database not available"}), 503
 
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, filename, raw_text, created_at
-                FROM scans ORDER BY created_at DESC
-            """)
-            scans = cur.fetchall()
-
-        # Convert RealDictRow to dict for mypy
-        scan_list: list[dict[str, Any]] = [dict(s) for s in scans]
-
-        if export_format == "csv":
-            import csv
-            import io
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(["ID", "Filename", "Raw Text", "Created"])
-            for s in scan_list:
-                writer.writerow([s["id"], s["filename"], s["raw_text"], s["created_at"]])
-            response = Response(output.getvalue(), mimetype="text/csv")
-            response.headers["Content-Disposition"] = "attachment; filename=scans_export.csv"
-            return response
-        else:
-            # JSON format - convert to serializable format
-            result = []
-            for s in scan_list:
-                created = s["created_at"]
-                result.append(
-                    {
-                        "id": s["id"],
-                        "filename": s["filename"],
-                        "raw_text": s["raw_text"],
-                        "created_at": created.isoformat() if created else None,
-                    }
-                )
-            response = Response(json_module.dumps(result, indent=2), mimetype="application/json")
-            response.headers["Content-Disposition"] = "attachment; filename=scans_export.json"
-            return response
+        cur = conn.cursor(name="export_scans")
+        cur.execute("""
+            SELECT id, filename, raw_text, created_at
+            FROM scans ORDER BY created_at DESC
+        """)
     except psycopg2.Error as e:
+        release_db_connection(conn)
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+
+    def generate() -> Iterator[str]:
+        try:
+            if export_format == "csv":
+                output = io.StringIO()
+                writer = csv.writer(output)
+                writer.writerow(["ID", "Filename", "Raw Text", "Created"])
+                while batch := cur.fetchmany(EXPORT_BATCH_SIZE):
+                    for s in cast("list[dict[str, Any]]", batch):
+                        writer.writerow([s["id"], s["filename"], s["raw_text"], s["created_at"]])
+                    yield output.getvalue()
+                    output.seek(0)
+                    output.truncate()
+                yield output.getvalue()  # just the header when there are no scans
+            else:
+                # Same bytes as json.dumps(list_of_scans, indent=2), one entry at a time
+                separator = "[\n  "
+                while batch := cur.fetchmany(EXPORT_BATCH_SIZE):
+                    chunk = []
+                    for s in cast("list[dict[str, Any]]", batch):
+                        created = s["created_at"]
+                        entry = {
+                            "id": s["id"],
+                            "filename": s["filename"],
+                            "raw_text": s["raw_text"],
+                            "created_at": created.isoformat() if created else None,
+                        }
+                        chunk.append(
+                            separator + json_module.dumps(entry, indent=2).replace("\n", "\n  ")
+                        )
+                        separator = ",\n  "
+                    yield "".join(chunk)
+                yield "[]" if separator == "[\n  " else "\n]"
+        except psycopg2.Error as e:
+            # Headers are already sent - all we can do is log and cut the stream short
+            logger.error(f"Scan export failed mid-stream: {e}")
+
+    def release() -> None:
+        cur.close()
+        release_db_connection(conn)
+
+    if export_format == "csv":
+        mimetype, filename = "text/csv", "scans_export.csv"
+    else:
+        mimetype, filename = "application/json", "scans_export.json"
+    response = Response(
+        generate(),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+    # The WSGI server always closes the response, even if the client goes away
+    # before the generator starts (when a finally: inside it would never run)
+    response.call_on_close(release)
+    return response
 
 
 @app.route("/logs", methods=["GET"])
@@ -966,23 +1510,31 @@ def ocr_endpoint() -> tuple[Response, int] | Response:
 
     try:
         # Read image
-        file_bytes = file.read()
-        nparr = np.frombuffer(file_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        nparr = read_upload(file.stream)
+        if nparr is None:
+            return jsonify({"error": "Unsupported image format"}), 400
+
+        img, image_scale = decode_image(nparr)
+        file_size_kb = nparr.nbytes / 1024
+        del nparr  # Compressed upload is no longer needed once decoded
 
         if img is None:
             return jsonify({"error": "Invalid image file"}), 400
 
+        # Preprocess at the size the detector will actually see
+        img, fit_scale = fit_to_max_side(img, OCR_MAX_SIDE)
+        image_scale *= fit_scale
+
         import time
 
         start_time = time.time()
 
-        file_size_kb = len(file_bytes) / 1024
         logger.info(f"Processing receipt: {file.filename} ({file_size_kb:.1f} KB)")
 
         # Preprocess image with OpenCV for better OCR accuracy
         preprocess_start = time.time()
         preprocessed = preprocess_for_ocr(img)
+        del img  # Free the decoded original before inference to lower peak memory
         preprocess_time = time.time() - preprocess_start
         logger.info(
             f"OpenCV preprocessing complete ({preprocess_time:.1f}s): denoise, CLAHE, deskew"
@@ -1001,18 +1553,21 @@ def ocr_endpoint() -> tuple[Response, int] | Response:
         logger.info("[OCR] Step 1/3: Text detection - finding text regions...")
 
         ocr_start = time.time()
-        result = ocr.predict(preprocessed)
+        try:
+            ocr_result = recognize(preprocessed)
+        except FutureTimeoutError:
+            logger.error(f"[OCR] Inference timed out after {OCR_TIMEOUT_SECONDS:.0f}s")
+            return jsonify({"error": "OCR timed out"}), 504
         ocr_time = time.time() - ocr_start
 
         logger.info("[OCR] Step 2/3: Text recognition - complete")
         logger.info("[OCR] Step 3/3: Post-processing - complete")
         logger.info(f"[OCR] Inference finished in {ocr_time:.1f}s")
 
-        if not result or len(result) == 0:
+        if not ocr_result:
             return jsonify({"error": "No text detected"}), 200
 
-        # New API returns list of dicts with 'rec_texts', 'rec_scores', 'dt_polys'
-        ocr_result = result[0]
+        # New API returns a dict per image with 'rec_texts', 'rec_scores', 'dt_polys'
         rec_texts = ocr_result.get("rec_texts", [])
         rec_scores = ocr_result.get("rec_scores", [])
         dt_polys = ocr_result.get("dt_polys", [])
@@ -1024,43 +1579,26 @@ def ocr_endpoint() -> tuple[Response, int] | Response:
         logger.info(f"Detected {len(rec_texts)} text blocks (total: {total_time:.1f}s)")
 
         # Extract blocks with coordinates
-        blocks = []
-        raw_lines = []
-
-        for i, text in enumerate(rec_texts):
-            confidence = rec_scores[i] if i < len(rec_scores) else 0.0
-            bbox = dt_polys[i] if i < len(dt_polys) else [[0, 0], [0, 0], [0, 0], [0, 0]]
+        blocks = OcrBlocks.from_ocr_result(rec_texts, rec_scores, dt_polys, scale=image_scale)
 
-            x_coords = [p[0] for p in bbox]
-            y_coords = [p[1] for p in bbox]
-
-            blocks.append(
-                {
-                    "text": text,
-                    "confidence": float(confidence),
-                    "_x": float(min(x_coords)),
-                    "_y": float(min(y_coords)),
-                    "_w": float(max(x_coords) - min(x_coords)),
-                    "_h": float(max(y_coords) - min(y_coords)),
-                }
-            )
-            raw_lines.append(text)
+        # Clean every text exactly once for both layout analysis and parsing
+        clean_blocks = blocks.cleaned()
 
         # Analyze layout - detect columns, rows, spacing
-        layout = analyze_layout_column_first(blocks)
+        layout = analyze_layout_column_first(clean_blocks)
         logger.info(f"Layout: {layout['column_count']} columns, {layout['row_count']} rows")
 
         # Use layout-aware text reconstruction if multi-column
-        raw_text = layout["raw_text"] if layout["column_count"] > 1 else "\n".join(raw_lines)
+        raw_text = layout["raw_text"] if layout["column_count"] > 1 else "\n".join(blocks.texts)
 
         # Parse receipt structure
-        parsed = parse_receipt_text(blocks)
+        parsed = parse_receipt_text(clean_blocks)
 
-        return jsonify(
+        return json_response(
             {
                 "success": True,
                 "filename": file.filename,
-                "blocks": blocks,
+                "blocks": blocks.to_dicts(),
                 "raw_text": raw_text,
                 "parsed": parsed,
                 "layout": {
@@ -1075,88 +1613,155 @@ def ocr_endpoint() -> tuple[Response, int] | Response:
         return jsonify({"error": str(e)}), 500
 
 
+# Tesseract OSD output lines we care about, e.g. "Orientation in degrees: 270"
+OSD_LINE_PATTERN = re.compile(
+    r"^(Orientation in degrees|Rotate|Orientation confidence|Script):\s*(\S+)", re.MULTILINE
+)
+
+
+# Orientation only needs legible glyph shapes; Tesseract's OSD time grows with
+# pixel count, so phone photos are shrunk to this long side before piping them in
+OSD_MAX_SIDE = 2000
+
+
+def prepare_osd_image(data: np.ndarray) -> np.ndarray | None:
+    """Decode to grayscale and cap the long side at OSD_MAX_SIDE; None if undecodable."""
+    gray = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    h, w = gray.shape
+    scale = OSD_MAX_SIDE / max(h, w)
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def init_osd_engine() -> Any:
+    """
+    Load Tesseract's OSD model once, in-process, if tesserocr is installed.
+
+    The CLI reloads osd.traineddata on every call; a persistent TessBaseAPI
+    pays that once. Returns None (use the CLI) when tesserocr is unavailable.
+    """
+    if tesserocr is None:
+        return None
+    try:
+        engine = tesserocr.PyTessBaseAPI(lang="osd", psm=tesserocr.PSM.OSD_ONLY)
+        logger.info("Tesseract OSD loaded in-process (tesserocr)")
+        return engine
+    except Exception as e:
+        logger.warning(f"tesserocr could not load OSD data, using the tesseract CLI: {e}")
+        return None
+
+
+osd_engine = init_osd_engine()
+# TessBaseAPI holds per-image state, so requests take turns on the shared engine
+osd_engine_lock = Lock()
+
+
+def run_osd(gray: np.ndarray | None, data: np.ndarray) -> str:
+    """
+    Run Tesseract OSD and return its report in the CLI's "Key: value" format.
+
+    Uses the in-process engine when available; otherwise pipes the image to
+    the tesseract CLI as raw PGM (a header + pixel dump, so encoding is just a
+    copy and Tesseract skips JPEG/PNG decoding), or as the original upload if
+    OpenCV couldn't decode it.
+    """
+    if osd_engine is not None and gray is not None:
+        h, w = gray.shape
+        with osd_engine_lock:
+            osd_engine.SetImageBytes(gray.tobytes(), w, h, 1, w)
+            osd = osd_engine.DetectOrientationScript()
+        if not osd:
+            return ""
+        orientation = osd["orient_deg"]
+        return (
+            f"Orientation in degrees: {orientation}\n"
+            f"Rotate: {(360 - orientation) % 360}\n"
+            f"Orientation confidence: {osd['orient_conf']:.2f}\n"
+            f"Script: {osd['script_name']}\n"
+            f"Script confidence: {osd['script_conf']:.2f}\n"
+        )
+
+    osd_image = data.tobytes()
+    if gray is not None:
+        ok, encoded = cv2.imencode(".pgm", gray)
+        if ok:
+            osd_image = encoded.tobytes()
+    logger.info(f"Running Tesseract OSD on {len(osd_image)} bytes...")
+    result = subprocess.run(
+        ["tesseract", "stdin", "stdout", "--psm", "0"],
+        input=osd_image,
+        capture_output=True,
+        timeout=30,
+    )
+    return result.stdout.decode("utf-8", errors="replace")
+
+
 @app.route("/detect-rotation", methods=["POST"])
 def detect_rotation() -> tuple[Response, int] | Response:
     """
     Detect image orientation using Tesseract OSD.
 
-    Request: JSON with 'image' field containing base64-encoded image data
+    Request: multipart/form-data with a 'file' field (like /ocr), or JSON with
+             an 'image' field containing base64-encoded image data
     Response: JSON with orientation, confidence, and correction angle
     """
     try:
         logger.info("Rotation detection request received")
 
-        data = request.get_json()
-        if not data or "image" not in data:
-            return jsonify({"error": "No image data provided"}), 400
+        if "file" in request.files:
+            # Raw upload: no base64 inflation on the wire or decode here
+            encoded = read_upload(request.files["file"].stream)
+            if encoded is None:
+                return jsonify({"error": "Unsupported image format"}), 400
+        else:
+            data = request.get_json(silent=True)
+            if not data or "image" not in data:
+                return jsonify({"error": "No image data provided"}), 400
 
-        # Extract base64 image data
-        image_data = data["image"]
+            # Extract base64 image data
+            image_data = data["image"]
 
-        # Remove data URL prefix if present
-        if "," in image_data:
-            image_data = image_data.split(",")[1]
+            # Remove data URL prefix if present
+            if "," in image_data:
+                image_data = image_data.split(",")[1]
 
-        # Decode base64
-        img_bytes = base64.b64decode(image_data)
-        logger.info(f"Decoded {len(img_bytes)} bytes for rotation detection")
+            # Decode base64
+            encoded = np.frombuffer(base64.b64decode(image_data), np.uint8)
+        logger.info(f"Received {encoded.nbytes} bytes for rotation detection")
 
-        # Save to temporary file for Tesseract
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp.write(img_bytes)
-            tmp_path = tmp.name
+        # Run Tesseract OSD (Orientation and Script Detection)
+        osd_output = run_osd(prepare_osd_image(encoded), encoded)
+        del encoded
 
-        try:
-            # Run Tesseract OSD (Orientation and Script Detection)
-            logger.info("Running Tesseract OSD...")
-            result = subprocess.run(
-                ["tesseract", tmp_path, "stdout", "--psm", "0"],
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
+        logger.info(f"Tesseract OSD output: {osd_output[:200] if osd_output else 'empty'}")
 
-            osd_output = result.stdout
-            logger.info(f"Tesseract OSD output: {osd_output[:200] if osd_output else 'empty'}")
-
-            # Parse orientation from OSD output
-            orientation = 0
-            rotate = 0
-            confidence = 0.0
-            script = "Unknown"
-
-            for line in osd_output.split("\n"):
-                if "Orientation in degrees:" in line:
-                    orientation = int(line.split(":")[1].strip())
-                elif "Rotate:" in line:
-                    rotate = int(line.split(":")[1].strip())
-                elif "Orientation confidence:" in line:
-                    confidence = float(line.split(":")[1].strip())
-                elif "Script:" in line:
-                    script = line.split(":")[1].strip()
-
-            logger.info(
-                "Detected: orientation=%d°, rotate=%d°, confidence=%.2f",
-                orientation,
-                rotate,
-                confidence,
-            )
+        # Parse orientation from OSD output in a single regex pass
+        osd_fields = dict(OSD_LINE_PATTERN.findall(osd_output))
+        orientation = int(osd_fields.get("Orientation in degrees", 0))
+        rotate = int(osd_fields.get("Rotate", 0))
+        confidence = float(osd_fields.get("Orientation confidence", 0.0))
+        script = osd_fields.get("Script", "Unknown")
 
-            return jsonify(
-                {
-                    "success": True,
-                    "orientation": orientation,
-                    "rotate": rotate,
-                    "confidence": confidence,
-                    "script": script,
-                    "raw_output": osd_output,
-                }
-            )
+        logger.info(
+            "Detected: orientation=%d°, rotate=%d°, confidence=%.2f",
+            orientation,
+            rotate,
+            confidence,
+        )
 
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        return jsonify(
+            {
+                "success": True,
+                "orientation": orientation,
+                "rotate": rotate,
+                "confidence": confidence,
+                "script": script,
+                "raw_output": osd_output,
+            }
+        )
 
     except subprocess.TimeoutExpired:
         logger.error("Tesseract OSD timed out")
@@ -1176,25 +1781,135 @@ def detect_rotation() -> tuple[Response, int] | Response:
         return jsonify({"error": str(e)}), 500
 
 
+def json_response(obj: Any, status: int = 200) -> Response:
+    """Serialize straight to a JSON Response with orjson, skipping jsonify's provider layer."""
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC), status=status, mimetype="application/json"
+    )
+
+
+# Saved scans never change after insert, so GET /scans/<id> bodies are cached
+# in-process (gunicorn runs a single worker) and dropped on delete/clear.
+# The generation counter stops a read that raced a delete from re-caching it.
+# Each entry is (body, etag); the ETag is a hash of the body, computed once.
+SCAN_CACHE_SIZE = 256
+scan_cache: OrderedDict[int, tuple[bytes, str]] = OrderedDict()
+scan_cache_lock = Lock()
+scan_cache_generation = 0
+
+
+def get_cached_scan(scan_id: int) -> tuple[bytes, str] | None:
+    """Return the cached (body, etag) for a scan, marking it recently used."""
+    with scan_cache_lock:
+        entry = scan_cache.get(scan_id)
+        if entry is not None:
+            scan_cache.move_to_end(scan_id)
+        return entry
+
+
+def cache_scan(scan_id: int, entry: tuple[bytes, str], generation: int) -> None:
+    """Cache a scan (body, etag) unless a delete happened since `generation` was read."""
+    with scan_cache_lock:
+        if generation != scan_cache_generation:
+            return
+        scan_cache[scan_id] = entry
+        scan_cache.move_to_end(scan_id)
+        if len(scan_cache) > SCAN_CACHE_SIZE:
+            scan_cache.popitem(last=False)
+
+
+def invalidate_scan_cache(scan_id: int | None = None) -> None:
+    """Drop one cached scan, or all of them when scan_id is None."""
+    global scan_cache_generation
+    with scan_cache_lock:
+        scan_cache_generation += 1
+        if scan_id is None:
+            scan_cache.clear()
+        else:
+            scan_cache.pop(scan_id, None)
+
+
+# Scan rows are never updated, so the set of ids fully determines the list. A hash
+# of the ordered ids is the list's ETag and the key for the last serialized list,
+# letting polling clients get a 304 and repeat readers skip aggregating raw_text.
+# Count + max(id) is not enough: ids are assigned at insert but become visible at
+# commit, so a slow insert committing after a delete can leave both unchanged.
+# The hash and the list are read in one REPEATABLE READ snapshot so a cached list
+# always matches its ETag.
+scan_list_cache: tuple[str, str] | None = None  # (etag, scans JSON array)
+
+
+def query_scan_list(cur: cursor) -> str:
+    """Return every scan, newest first, as a JSON array built by PostgreSQL."""
+    # Build the JSON array in PostgreSQL: one text value comes back
+    # instead of a Python dict per row that then has to be serialized.
+    # created_at is rendered exactly as orjson renders it for GET /scans/<id>:
+    # ISO 8601 UTC, with the fraction omitted when it is a whole second.
+    cur.execute("""
+        SELECT COALESCE(
+            json_agg(
+                json_build_object(
+                    'id', id,
+                    'filename', filename,
+                    'raw_text', raw_text,
+                    'created_at', to_char(created_at, 'YYYY-MM-DD"T"HH24:MI:SS')
+                        || CASE
+                            WHEN created_at = date_trunc('second', created_at) THEN ''
+                            ELSE to_char(created_at, '.US')
+                        END
+                        || '+00:00'
+                )
+                ORDER BY created_at DESC
+            ),
+            '[]'
+        )::text AS scans
+        FROM scans
+    """)
+    row = cur.fetchone()
+    return row["scans"] if row else "[]"  # type: ignore[call-overload]
+
+
 @app.route("/scans", methods=["GET"])
 def list_scans() -> tuple[Response, int] | Response:
     """List all saved scans."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database not available"}), 503
+    global scan_list_cache
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database not available"}), 503
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, filename, raw_text, created_at
-                FROM scans ORDER BY created_at DESC
-            """)
-            scans = cur.fetchall()
-        return jsonify({"scans": [dict(s) for s in scans]})
-    except psycopg2.Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+        try:
+            with conn.cursor() as cur:
+                # The pooled connection starts a fresh transaction here (putconn
+                # rolls back), so this applies to both queries below
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+                cur.execute(
+                    "SELECT left(md5(COALESCE(string_agg(id::text, ',' ORDER BY id), '')), 16)"
+                    " AS version FROM scans"
+                )
+                etag = cur.fetchone()["version"]  # type: ignore[index]
+
+                # Flask-Compress hands out "<etag>:br" / "<etag>:gzip" for compressed
+                # bodies, so compare on the base tag and echo the client's variant
+                client_tag = next(
+                    (tag for tag in request.if_none_match if tag.split(":", 1)[0] == etag),
+                    etag if request.if_none_match.star_tag else None,
+                )
+                if client_tag is not None:
+                    not_modified = Response(status=304)
+                    not_modified.set_etag(client_tag)
+                    return not_modified
+
+                cached = scan_list_cache
+                if cached is not None and cached[0] == etag:
+                    scans_json = cached[1]
+                else:
+                    scans_json = query_scan_list(cur)
+                    scan_list_cache = (etag, scans_json)
+            response = Response(f'{{"scans":{scans_json}}}', mimetype="application/json")
+            response.set_etag(etag)
+            return response
+        except psycopg2.Error as e:
+            return jsonify({"error": str(e)}), 500
 
 
 @app.route("/scans", methods=["POST"])
@@ -1204,99 +1919,166 @@ def save_scan() -> tuple[Response, int] | Response:
     if not data:
         return jsonify({"error": "No data provided"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database not available"}), 503
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database not available"}), 503
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO scans (filename, raw_text)
-                VALUES (%s, %s)
-                RETURNING id
-                """,
-                (data.get("filename"), data.get("raw_text")),
-            )
-            row = cur.fetchone()
-            if row is None:
-                raise ValueError("Failed to insert scan")
-            scan_id = row["id"]  # type: ignore[call-overload]
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO scans (filename, raw_text)
+                    VALUES (%s, %s)
+                    RETURNING id
+                    """,
+                    (data.get("filename"), data.get("raw_text")),
+                )
+                row = cur.fetchone()
+                if row is None:
+                    raise ValueError("Failed to insert scan")
+                scan_id = row["id"]  # type: ignore[call-overload]
+                conn.commit()
+
+            return jsonify({"success": True, "scan_id": scan_id})
+        except psycopg2.Error as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 500
+
+
+def copy_text_field(value: str | None) -> str:
+    """Render one value for COPY's text format (NULL as \\N, control chars escaped)."""
+    if value is None:
+        return "\\N"
+    return (
+        value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+@app.route("/scans/bulk", methods=["POST"])
+def save_scans_bulk() -> tuple[Response, int] | Response:
+    """
+    Save many scans in one COPY, for importing historical data.
+
+    Request: JSON {"scans": [{"filename": ..., "raw_text": ...}, ...]}
+    Response: JSON with the number of scans inserted
+    """
+    import io
+
+    data = request.get_json()
+    scans = data.get("scans") if isinstance(data, dict) else None
+    if not isinstance(scans, list) or not all(isinstance(s, dict) for s in scans):
+        return jsonify({"error": "Expected a 'scans' list of objects"}), 400
+    if not scans:
+        return jsonify({"success": True, "inserted_count": 0})
+
+    # Both columns are text; reject anything else rather than storing its repr
+    for i, s in enumerate(scans):
+        for field in ("filename", "raw_text"):
+            if not isinstance(s.get(field), (str, type(None))):
+                return jsonify({"error": f"scans[{i}].{field} must be a string or null"}), 400
+
+    # COPY streams every row in one statement instead of one INSERT round-trip each
+    buf = io.StringIO()
+    for s in scans:
+        buf.write(copy_text_field(s.get("filename")))
+        buf.write("\t")
+        buf.write(copy_text_field(s.get("raw_text")))
+        buf.write("\n")
+    buf.seek(0)
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database not available"}), 503
+
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert("COPY scans (filename, raw_text) FROM STDIN", buf)
+                inserted_count = cur.rowcount
             conn.commit()
+            return jsonify({"success": True, "inserted_count": inserted_count})
+        except psycopg2.Error as e:
+            conn.rollback()
+            return jsonify({"error": str(e)}), 500
 
-        return jsonify({"success": True, "scan_id": scan_id})
-    except psycopg2.Error as e:
-        conn.rollback()
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
+def fetch_scan(scan_id: int) -> tuple[bytes, str] | Response:
+    """Load one scan as (body, etag) and cache it, or return the error response."""
+    generation = scan_cache_generation
+    with db_connection() as conn:
+        if not conn:
+            return json_response({"error": "Database not available"}, 503)
 
-@app.route("/scans/<int:scan_id>", methods=["GET"])
-def get_scan(scan_id: int) -> tuple[Response, int] | Response:
-    """Get a specific scan."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database not available"}), 503
+        try:
+            with conn.cursor() as cur:
+                execute_prepared(cur, "get_scan", (scan_id,))
+                scan = cur.fetchone()
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM scans WHERE id = %s", (scan_id,))
-            scan = cur.fetchone()
+                if not scan:
+                    return json_response({"error": "Scan not found"}, 404)
 
-            if not scan:
-                return jsonify({"error": "Scan not found"}), 404
+            body = orjson.dumps(scan, option=orjson.OPT_NAIVE_UTC)
+            entry = (body, hashlib.blake2b(body, digest_size=8).hexdigest())
+            cache_scan(scan_id, entry, generation)
+            return entry
+        except psycopg2.Error as e:
+            return json_response({"error": str(e)}, 500)
 
-        return jsonify(dict(scan))
-    except psycopg2.Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+
+@app.route("/scans/<int:scan_id>", methods=["GET"])
+def get_scan(scan_id: int) -> Response:
+    """Get a specific scan (answers 304 when the client's ETag still matches)."""
+    entry = get_cached_scan(scan_id) or fetch_scan(scan_id)
+    if isinstance(entry, Response):
+        return entry
+
+    body, etag = entry
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.make_conditional(request)
+    return response
 
 
 @app.route("/scans/<int:scan_id>", methods=["DELETE"])
-def delete_scan(scan_id: int) -> tuple[Response, int] | Response:
+def delete_scan(scan_id: int) -> Response:
     """Delete a scan."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database not available"}), 503
+    with db_connection() as conn:
+        if not conn:
+            return json_response({"error": "Database not available"}, 503)
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM scans WHERE id = %s RETURNING id", (scan_id,))
-            deleted = cur.fetchone()
-            conn.commit()
+        try:
+            with conn.cursor() as cur:
+                execute_prepared(cur, "delete_scan", (scan_id,))
+                deleted_count = cur.rowcount
+                conn.commit()
+            invalidate_scan_cache(scan_id)
 
-        if not deleted:
-            return jsonify({"error": "Scan not found"}), 404
+            if deleted_count == 0:
+                return json_response({"error": "Scan not found"}, 404)
 
-        return jsonify({"success": True})
-    except psycopg2.Error as e:
-        conn.rollback()
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+            return json_response({"success": True})
+        except psycopg2.Error as e:
+            conn.rollback()
+            return json_response({"error": str(e)}, 500)
 
 
 @app.route("/scans/clear", methods=["DELETE"])
 def clear_all_scans() -> tuple[Response, int] | Response:
     """Delete all scans from the database."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database not available"}), 503
+    with db_connection() as conn:
+        if not conn:
+            return json_response({"error": "Database not available"}, 503)
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM scans")
-            deleted_count = cur.rowcount
-            conn.commit()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM scans")
+                deleted_count = cur.rowcount
+                conn.commit()
+            invalidate_scan_cache()
 
-        return jsonify({"success": True, "deleted_count": deleted_count})
-    except psycopg2.Error as e:
-        conn.rollback()
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+            return json_response({"success": True, "deleted_count": deleted_count})
+        except psycopg2.Error as e:
+            conn.rollback()
+            return json_response({"error": str(e)}, 500)
 
 
 # -----------------------------------------------------------------------------
@@ -1304,4 +2086,4 @@ def clear_all_scans() -> tuple[Response, int] | Response:
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
     init_database()
-    app.run(host="0.0.0.0", port=5001, debug=True)
+    app.run(host="0.0.0.0", port=5001, debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -138,17 +138,13 @@ export async function detectTextOrientation(
   try {
     onLog?.('Detecting text orientation...', 'info');
 
-    // Convert file to base64
-    const base64 = await new Promise<string>((resolve) => {
-      const reader = new FileReader();
-      reader.onload = () => resolve(reader.result as string);
-      reader.readAsDataURL(file);
-    });
+    // Send the raw file - base64 would inflate the upload by a third
+    const formData = new FormData();
+    formData.append('file', file);
 
     const response = await fetch(`${API_BASE}/detect-rotation`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ image: base64 })
+      body: formData
     });
 
     if (!response.ok) {
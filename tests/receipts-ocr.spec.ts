@@ -159,4 +159,37 @@ test.describe('Backend Integration', () => {
     const data = await ocrResponse.json();
     expect(data).toHaveProperty('raw_text');
   });
+
+  test('scan list answers compressed conditional GET with 304', async ({ request }) => {
+    const response = await request.get('http://localhost:5001/health');
+    if (!response.ok()) {
+      test.skip();
+      return;
+    }
+
+    // Big enough to clear the compression threshold
+    const saved = await request.post('http://localhost:5001/scans', {
+      data: { filename: 'etag-test.png', raw_text: 'compressible '.repeat(300) },
+    });
+    expect(saved.ok()).toBeTruthy();
+    const { scan_id: scanId } = await saved.json();
+
+    try {
+      const first = await request.get('http://localhost:5001/scans', {
+        headers: { 'Accept-Encoding': 'br' },
+      });
+      expect(first.status()).toBe(200);
+      expect(first.headers()['content-encoding']).toBe('br');
+      const etag = first.headers()['etag'];
+      expect(etag).toMatch(/:br"$/);
+
+      const second = await request.get('http://localhost:5001/scans', {
+        headers: { 'Accept-Encoding': 'br', 'If-None-Match': etag },
+      });
+      expect(second.status()).toBe(304);
+      expect(second.headers()['etag']).toBe(etag);
+    } finally {
+      await request.delete(`http://localhost:5001/scans/${scanId}`);
+    }
+  });
 });